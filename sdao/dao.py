@@ -49,9 +49,17 @@ class GetDao:
 
         if debug: return {'SQL':sql, 'Data': data}
 
+        # Builders that support it get the key back from the INSERT itself.
+        # Resolved only past debug, which must not touch the database.
+        returning = getattr(self.sqlbuilder, 'supportsReturning', False)
+        if returning:
+            tbKeyName = self.cnn.getPrimaryKey(self.table)
+            sql = self.sqlbuilder.insert(data, tbKeyName)
+
         lastId = self.cnn.create(sql, data)
 
-        tbKeyName = self.cnn.getPrimaryKey(self.table)
+        if not returning:
+            tbKeyName = self.cnn.getPrimaryKey(self.table)
 
         if tbKeyName is not None and lastId is not None:
             if isinstance(data, dict):
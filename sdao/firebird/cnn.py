@@ -2,8 +2,136 @@
 
 import fdb
 import re
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import lru_cache
+from operator import itemgetter
+
+# Rows sent per executemany() call on list inserts
+_BATCH_SIZE = 1000
+
+# Rows pulled per fetchmany() call when reading
+_FETCH_SIZE = 1000
+
+# Statements merged into one roundtrip by readMany() / deleteMany(), at most.
+# Each merge is also sized against Firebird's 255 contexts per statement and
+# its 64KB statement length limit of versions before 3.0.
+_MERGE_SIZE = 100
+_MAX_CONTEXTS = 255
+_MAX_SQL_LENGTH = 65535
+
+# Prepared statements kept per connection
+_PREPARED_SIZE = 128
+
+# SELECT column-name tuples kept per connection
+_COLNAMES_SIZE = 512
+
+_pyformat_pattern = re.compile(r"%\(([^)]+)\)s")
+_where_pattern = re.compile(r"\bWHERE\b", re.IGNORECASE)
+# Each FROM/JOIN opens at least one context (table, view or derived table)
+_context_pattern = re.compile(r"\b(FROM|JOIN)\b", re.IGNORECASE)
+_returning_pattern = re.compile(r"\sRETURNING\s", re.IGNORECASE)
+# One-shot schema/admin statements, not worth keeping prepared
+_ddl_pattern = re.compile(
+    r"^\s*(CREATE|RECREATE|ALTER|DROP|DECLARE|GRANT|REVOKE|COMMENT|SET)\b",
+    re.IGNORECASE,
+)
+
+
+def _split_pyformat(sql: str):
+    """
+    Single pass over the SQL: replaces every '%(name)s' with '?' while
+    collecting the names in placeholder order.
+    """
+    names = []
+
+    def repl(match):
+        names.append(match.group(1))
+        return "?"
+
+    qmark_sql = _pyformat_pattern.sub(repl, sql)
+    return qmark_sql, tuple(names)
+
+
+@lru_cache(maxsize=512)
+def _compile_plan(sql: str):
+    """
+    Returns (qmark_sql, names, getter) for a pyformat SQL, cached per SQL
+    string, since GetDao issues the same statements over and over.
+    'getter' picks the positional tuple out of a params dict in one C call.
+    """
+    qmark_sql, names = _split_pyformat(sql)
+
+    if len(names) == 0:
+        getter = lambda params: ()
+    elif len(names) == 1:
+        # itemgetter() with a single name returns the bare value
+        name = names[0]
+        getter = lambda params: (params[name],)
+    else:
+        getter = itemgetter(*names)
+
+    return qmark_sql, names, getter
+
+
+def _merge_size(part_sql: str, separator: str):
+    """
+    How many copies of 'part_sql' to merge into one statement, joined by
+    'separator', capped by _MERGE_SIZE and _MAX_SQL_LENGTH, and by
+    _MAX_CONTEXTS as far as the SQL text shows. A view counts as one FROM
+    here but opens one context per base table on the server, so the result
+    is only an estimate: callers retry smaller on "too many contexts".
+    """
+    contexts = len(_context_pattern.findall(part_sql))
+    by_contexts = _MAX_CONTEXTS // contexts if contexts else _MERGE_SIZE
+    by_length = _MAX_SQL_LENGTH // (len(part_sql) + len(separator))
+    return max(1, min(_MERGE_SIZE, by_contexts, by_length))
+
+
+def _too_many_contexts(exc: Exception):
+    """
+    Whether the server refused a statement for going over _MAX_CONTEXTS.
+    """
+    return "too many contexts" in str(exc).lower()
+
+
+def _free_statement(ps):
+    """
+    Drops a PreparedStatement on the server. fdb's public close() only closes
+    its result set and keeps the statement prepared (and its tables in use).
+    """
+    try:
+        getattr(ps, "_close", ps.close)()
+    except Exception:
+        pass
+
+
+@lru_cache(maxsize=512)
+def _returns_row(sql: str):
+    """
+    Whether the (INSERT) SQL hands a row back through a RETURNING clause.
+    """
+    return _returning_pattern.search(sql) is not None
+
+
+@lru_cache(maxsize=512)
+def _row_factory(col_names: tuple):
+    """
+    Returns a function turning one fetched row into a dict, built once per
+    column set. It is generated as a plain dict display, e.g.
+    {'ID': r[0], 'NAME': r[1]}, which beats dict(zip(...)) per row.
+    """
+    items = ", ".join(f"{name!r}: r[{i}]" for i, name in enumerate(col_names))
+    namespace = {}
+    exec(f"def make_dict(r):\n    return {{{items}}}", namespace)
+    return namespace["make_dict"]
+
 
 class Cnn:
+    # getPrimaryKey() results shared by every connection to the same
+    # database, keyed on (dsn, upper-cased table name)
+    _pk_cache = {}
+
     def __init__(
         self,
         database: str,
@@ -26,6 +154,7 @@ class Cnn:
             dsn = database
         else:
             dsn = f"{host}/{port}:{database}"
+        self._dsn = dsn
 
         self.cnn = fdb.connect(
             dsn=dsn,
@@ -36,6 +165,13 @@ class Cnn:
 
         self.dialect = "firebird"
         self._cursor = None
+        # LRU of column names of the SELECTs already run, keyed on executed SQL
+        self._colnames_cache = OrderedDict()
+        # LRU of fdb PreparedStatements on self._cursor, keyed on qmark SQL
+        self._prepared = OrderedDict()
+        self._in_transaction = False
+        # Whether the driver's cursor exposes 'lastrowid', probed on first create
+        self._has_lastrowid = None
 
     def __del__(self):
         try:
@@ -52,7 +188,73 @@ class Cnn:
 
     # ---------- Internal helpers ----------
 
-    _pyformat_pattern = re.compile(r"%\(([^)]+)\)s")
+    def _get_cursor(self):
+        """
+        Returns the reusable cursor of this connection, opening it on first
+        use. FDB cursors stay bound to the connection after close(), so the
+        same one serves every statement.
+        """
+        if self._cursor is None:
+            self._cursor = self.cnn.cursor()
+        return self._cursor
+
+    def _release_cursor(self):
+        """
+        Closes the current result set but keeps the cursor for the next call.
+        If the driver refuses, drop it so _get_cursor() opens a fresh one.
+        """
+        if getattr(self, "_cursor", None):
+            try:
+                self._cursor.close()
+            except Exception:
+                self._cursor = None
+                # Statements were prepared on the dropped cursor
+                self._prepared.clear()
+
+    def _prepare(self, sql: str):
+        """
+        Returns the PreparedStatement for 'sql' on the shared cursor, preparing
+        it once and keeping the last _PREPARED_SIZE ones around. DDL is
+        returned as plain SQL, to be prepared and dropped by the driver.
+        """
+        if _ddl_pattern.match(sql):
+            # Firebird refuses DROP/ALTER on objects that prepared statements
+            # of this attachment still use, and cached column names / keys
+            # may no longer match the schema afterwards
+            self.invalidateSchemaCache()
+            return sql
+
+        ps = self._prepared.get(sql)
+        if ps is not None:
+            self._prepared.move_to_end(sql)
+            return ps
+
+        ps = self._get_cursor().prep(sql)
+        self._prepared[sql] = ps
+        if len(self._prepared) > _PREPARED_SIZE:
+            _, evicted = self._prepared.popitem(last=False)
+            _free_statement(evicted)
+        return ps
+
+    def _drop_prepared(self):
+        """
+        Frees every cached PreparedStatement.
+        """
+        self._release_cursor()
+        for ps in self._prepared.values():
+            _free_statement(ps)
+        self._prepared.clear()
+
+    def _execute(self, sql: str, seq=None):
+        """
+        Executes 'sql' on the shared cursor through its prepared statement.
+        """
+        cur = self._get_cursor()
+        if seq is None:
+            cur.execute(self._prepare(sql))
+        else:
+            cur.execute(self._prepare(sql), seq)
+        return cur
 
     def _convert_pyformat_to_qmark(self, sql: str, params: dict):
         """
@@ -67,48 +269,72 @@ class Cnn:
         if not params:
             return sql, None
 
-        if "%(" not in sql:
+        # A placeholderless SQL has an empty plan, so this stays a cache hit
+        new_sql, names, getter = _compile_plan(sql)
+
+        if not names:
             # Caller probably used Firebird-native parameter style or no params
             # at all. We'll just return as-is and pass params untouched.
             return sql, params
 
-        new_sql_parts = []
-        values = []
-        last_pos = 0
-
-        for match in self._pyformat_pattern.finditer(sql):
-            start, end = match.span()
-            name = match.group(1)
-
-            # Append text before this placeholder
-            new_sql_parts.append(sql[last_pos:start])
-            # Replace '%(name)s' with '?'
-            new_sql_parts.append("?")
-            last_pos = end
-
-            # Pick value by name from dict
-            if name not in params:
-                raise KeyError(f"Parameter '{name}' not found for SQL: {sql}")
-            values.append(params[name])
-
-        # Append the rest of the SQL
-        new_sql_parts.append(sql[last_pos:])
-        new_sql = "".join(new_sql_parts)
+        # Pick values by name from dict, in placeholder order
+        try:
+            values = getter(params)
+        except KeyError as exc:
+            raise KeyError(
+                f"Parameter '{exc.args[0]}' not found for SQL: {sql}"
+            ) from None
 
         # Return converted SQL and positional params list
         return new_sql, values
 
+    def _column_names(self, cur, sql: str):
+        """
+        Column names of the SELECT just executed on 'cur', taken from
+        cursor.description and stripped once per SQL. Keeps the last
+        _COLNAMES_SIZE SQLs, like the prepared-statement cache.
+        """
+        col_names = self._colnames_cache.get(sql)
+        if col_names is not None:
+            self._colnames_cache.move_to_end(sql)
+            return col_names
+
+        col_names = tuple(col[0].strip() for col in cur.description)
+        self._colnames_cache[sql] = col_names
+        if len(self._colnames_cache) > _COLNAMES_SIZE:
+            self._colnames_cache.popitem(last=False)
+        return col_names
+
+    def _iter_rows(self, cur, col_names: tuple, arraysize: int):
+        """
+        Yields the pending rows of 'cur' as dicts, 'arraysize' rows per fetch.
+        """
+        make_dict = _row_factory(col_names)
+        while True:
+            rows = cur.fetchmany(arraysize)
+            if not rows:
+                break
+            yield from map(make_dict, rows)
+
+    def _merged_params(self, sql: str, paramsList: list):
+        """
+        Positional params of 'sql' repeated once per params in 'paramsList'.
+        """
+        seq = []
+        for params in paramsList:
+            values = self._convert_pyformat_to_qmark(sql, params)[1]
+            # A dict comes back untouched when the SQL has no '%(name)s'
+            # markers: there is nothing in it to bind positionally
+            if values and not isinstance(values, dict):
+                seq.extend(values)
+        return seq
+
     def _execute_dml(self, sql: str, params):
         """
         Helper for UPDATE and DELETE.
         """
-        self._cursor = self.cnn.cursor()
         sql_to_exec, seq = self._convert_pyformat_to_qmark(sql, params)
-
-        if seq is None:
-            self._cursor.execute(sql_to_exec)
-        else:
-            self._cursor.execute(sql_to_exec, seq)
+        self._execute(sql_to_exec, seq)
 
         affected_rows = self._cursor.rowcount
 
@@ -124,38 +350,48 @@ class Cnn:
         INSERT execution. Supports dict or list[dict], like the other dialects.
         Returns 'lastId' when possible, or None otherwise.
         """
-        self._cursor = self.cnn.cursor()
+        self._get_cursor()
+        returned = None
 
         # We need to support both single-row and multi-row inserts
         # where SQL uses pyformat-style '%(name)s'.
         if isinstance(data, list):
             # Build positional order once based on the SQL
-            names_in_order = [
-                m.group(1) for m in self._pyformat_pattern.finditer(sql)
-            ]
+            qmark_sql, names_in_order, getter = _compile_plan(sql)
             if not names_in_order:
                 # No '%(name)s' markers, just execute as-is
-                self._cursor.executemany(sql, data)
+                self._cursor.executemany(self._prepare(sql), data)
             else:
-                qmark_sql = self._pyformat_pattern.sub("?", sql)
-                seq_params = []
-                for row in data:
-                    seq_params.append(tuple(row[name] for name in names_in_order))
-                self._cursor.executemany(qmark_sql, seq_params)
+                # Prepare once and feed rows in bounded chunks, so a big
+                # list never gets fully duplicated as positional tuples.
+                # Rows are not folded into one multi-row statement: Firebird
+                # has no "VALUES (...), (...)" syntax, and the UNION ALL /
+                # EXECUTE BLOCK workarounds reject untyped '?' parameters.
+                ps = self._prepare(qmark_sql)
+                for start in range(0, len(data), _BATCH_SIZE):
+                    self._cursor.executemany(
+                        ps,
+                        [getter(row) for row in data[start:start + _BATCH_SIZE]],
+                    )
         elif isinstance(data, dict):
             sql_to_exec, seq = self._convert_pyformat_to_qmark(sql, data)
-            if seq is None:
-                self._cursor.execute(sql_to_exec)
-            else:
-                self._cursor.execute(sql_to_exec, seq)
+            self._execute(sql_to_exec, seq)
+            if _returns_row(sql_to_exec):
+                # INSERT ... RETURNING hands the generated key back right away
+                returned = self._cursor.fetchone()
         else:
             raise TypeError("Data for 'create' must be dict or list[dict]")
 
         # Firebird does not have a universal "last inserted ID" like MySQL.
         # You usually use GENERATORs + triggers, or IDENTITY columns + RETURNING.
         # FDB's cursor may have 'lastrowid' only in specific setups.
+        if self._has_lastrowid is None:
+            self._has_lastrowid = hasattr(self._cursor, "lastrowid")
+
         last_id = None
-        if hasattr(self._cursor, "lastrowid"):
+        if returned is not None:
+            last_id = returned[0]
+        elif self._has_lastrowid:
             last_id = self._cursor.lastrowid
 
         if self.autocommit:
@@ -168,27 +404,47 @@ class Cnn:
         SELECT execution. Returns list[dict], or a single dict/None
         when onlyFirstRow=True, consistent with your SQLite implementation.
         """
-        self._cursor = self.cnn.cursor()
         sql_to_exec, seq = self._convert_pyformat_to_qmark(sql, params)
+        cur = self._execute(sql_to_exec, seq)
 
-        if seq is None:
-            self._cursor.execute(sql_to_exec)
-        else:
-            self._cursor.execute(sql_to_exec, seq)
+        col_names = self._column_names(cur, sql_to_exec)
 
-        rows = self._cursor.fetchall()
+        if onlyFirstRow:
+            row = cur.fetchone()
+            # Closing the result set lets the server drop the remaining rows
+            self._release_cursor()
+            return _row_factory(col_names)(row) if row is not None else None
 
-        # Map to dict using cursor.description
-        col_names = [col[0].strip() for col in self._cursor.description]
-        result = [dict(zip(col_names, row)) for row in rows]
+        return list(self._iter_rows(cur, col_names, _FETCH_SIZE))
 
-        self._cursor.close()
-        self._cursor = None
+    def readIter(self, sql: str, params: dict = {}, arraysize: int = _FETCH_SIZE):
+        """
+        SELECT execution that yields one dict per row, fetching 'arraysize'
+        rows at a time instead of loading the whole result set in memory.
+        It runs in a transaction of its own, so commits done by other calls on
+        this Cnn while iterating do not close its cursor. Being separate, it
+        does not see changes not yet committed by the main transaction.
+        """
+        trans = self.cnn.trans()
+        cur = trans.cursor()
+        try:
+            sql_to_exec, seq = self._convert_pyformat_to_qmark(sql, params)
 
-        if onlyFirstRow:
-            return result[0] if len(result) > 0 else None
-        else:
-            return result
+            if seq is None:
+                cur.execute(sql_to_exec)
+            else:
+                cur.execute(sql_to_exec, seq)
+
+            col_names = self._column_names(cur, sql_to_exec)
+            yield from self._iter_rows(cur, col_names, arraysize)
+        finally:
+            try:
+                cur.close()
+                # Read-only work: nothing to keep, just release the snapshot
+                trans.rollback()
+                trans.close()
+            except Exception:
+                pass
 
     def update(self, sql: str, params: dict):
         return self._execute_dml(sql, params)
@@ -196,23 +452,122 @@ class Cnn:
     def delete(self, sql: str, params: dict = {}):
         return self._execute_dml(sql, params)
 
+    def readMany(self, sql: str, paramsList: list):
+        """
+        Runs the same SELECT once per params dict, merging several of them
+        per roundtrip with UNION ALL (see _merge_size; a chunk refused for
+        too many contexts, e.g. over multi-table views, is retried at half
+        the size). Returns one list[dict] per params dict, in order.
+        """
+        qmark_sql = _compile_plan(sql)[0]
+        results = [[] for _ in paramsList]
+        size = _merge_size(
+            f'SELECT 0 AS "SDAO$IDX", q0.* FROM ({qmark_sql}) q0', " UNION ALL "
+        )
+
+        start = 0
+        while start < len(paramsList):
+            chunk = paramsList[start:start + size]
+
+            # Tag every row with the index of the statement it came from
+            merged_sql = " UNION ALL ".join(
+                f'SELECT {i} AS "SDAO$IDX", q{i}.* FROM ({qmark_sql}) q{i}'
+                for i in range(len(chunk))
+            )
+            try:
+                cur = self._execute(merged_sql, self._merged_params(sql, chunk))
+            except fdb.DatabaseError as exc:
+                if size > 1 and _too_many_contexts(exc):
+                    size //= 2
+                    continue
+                raise
+            rows = cur.fetchall()
+
+            make_dict = _row_factory(self._column_names(cur, merged_sql)[1:])
+            for row in rows:
+                results[start + row[0]].append(make_dict(row[1:]))
+
+            start += len(chunk)
+
+        return results
+
+    def deleteMany(self, sql: str, paramsList: list):
+        """
+        Runs the same DELETE once per params dict, merging several of them
+        per roundtrip by OR-ing their WHERE conditions (see _merge_size and
+        readMany() for the chunk sizing). Returns the total of affected rows:
+        one merged statement only reports its own count, and overlapping
+        conditions would make per-call counts ambiguous anyway.
+        """
+        if not paramsList:
+            return 0
+
+        qmark_sql = _compile_plan(sql)[0]
+        match = _where_pattern.search(qmark_sql)
+        if match is None:
+            # No condition to merge: run each statement as given
+            return sum(self._execute_dml(sql, params) for params in paramsList)
+
+        head = qmark_sql[:match.start()]
+        condition = f"({qmark_sql[match.end():]})"
+        size = _merge_size(condition, " OR ")
+        affected_rows = 0
+
+        start = 0
+        while start < len(paramsList):
+            chunk = paramsList[start:start + size]
+            merged_sql = f"{head} WHERE " + " OR ".join([condition] * len(chunk))
+            try:
+                cur = self._execute(merged_sql, self._merged_params(sql, chunk))
+            except fdb.DatabaseError as exc:
+                if size > 1 and _too_many_contexts(exc):
+                    size //= 2
+                    continue
+                raise
+            affected_rows += cur.rowcount
+            start += len(chunk)
+
+        if self.autocommit:
+            self.commit()
+
+        return affected_rows
+
+    @contextmanager
+    def transaction(self):
+        """
+        Groups calls into one transaction: autocommit is suspended inside the
+        block and a single commit runs at its end, or a rollback if it exits
+        with any exception.
+        Saves one commit roundtrip per statement on bulk flows. Nested blocks
+        join the outer one.
+        """
+        if self._in_transaction:
+            yield self
+            return
+
+        autocommit = self.autocommit
+        self.autocommit = False
+        self._in_transaction = True
+        try:
+            yield self
+        except BaseException:
+            # Also on KeyboardInterrupt/GeneratorExit/SystemExit: otherwise the
+            # partial work would be committed by the next autocommit call
+            self.rollback()
+            raise
+        else:
+            self.commit()
+        finally:
+            self.autocommit = autocommit
+            self._in_transaction = False
+
     def commit(self):
         self.cnn.commit()
-        if getattr(self, "_cursor", None):
-            try:
-                self._cursor.close()
-            except Exception:
-                pass
-            self._cursor = None
+        self._release_cursor()
 
     def rollback(self):
         self.cnn.rollback()
-        if getattr(self, "_cursor", None):
-            try:
-                self._cursor.close()
-            except Exception:
-                pass
-            self._cursor = None
+        self._release_cursor()
 
     def getPrimaryKey(self, table: str):
         """
@@ -221,8 +576,16 @@ class Cnn:
 
         Based on Firebird system tables RDB$RELATION_CONSTRAINTS and
         RDB$INDEX_SEGMENTS. :contentReference[oaicite:1]{index=1}
+        Found keys are cached per table and database in _pk_cache, shared by
+        every Cnn of the process. The cache is dropped for this database on
+        any DDL run through this Cnn, or by invalidateSchemaCache(); DDL run
+        elsewhere needs that call. Tables without a key are not cached, so a
+        key added later is picked up on the next call.
         """
-        cur = self.cnn.cursor()
+        cacheKey = (self._dsn, table.upper())
+        if cacheKey in self._pk_cache:
+            return self._pk_cache[cacheKey]
+
         sql = """
             SELECT
                 TRIM(seg.RDB$FIELD_NAME)
@@ -236,13 +599,27 @@ class Cnn:
             ORDER BY
                 seg.RDB$FIELD_POSITION
         """
-        cur.execute(sql, (table,))
+        cur = self._execute(sql, (table,))
         cols = [row[0] for row in cur.fetchall()]
-        cur.close()
 
         if len(cols) == 0:
-            return None
+            primaryKey = None
         elif len(cols) == 1:
-            return cols[0]
+            primaryKey = cols[0]
         else:
-            return cols
+            primaryKey = cols
+
+        if primaryKey is not None:
+            self._pk_cache[cacheKey] = primaryKey
+        return primaryKey
+
+    def invalidateSchemaCache(self):
+        """
+        Forgets the primary keys, column names and prepared statements cached
+        for this database, e.g. after an ALTER TABLE.
+        """
+        for cacheKey in [key for key in self._pk_cache if key[0] == self._dsn]:
+            self._pk_cache.pop(cacheKey, None)
+        self._colnames_cache.clear()
+        # Prepared statements carry the old metadata too
+        self._drop_prepared()
@@ -1,12 +1,109 @@
 # sdao/firebird/sqlbuilder.py
 
+from functools import lru_cache
+
+# IN-list lengths emitted by whereCondition(). Lists of close lengths share
+# one qmark SQL, so they hit the same prepared statement in Cnn.
+_IN_LIST_SIZES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+def _in_list_size(length: int):
+    for size in _IN_LIST_SIZES:
+        if length <= size:
+            return size
+    return length
+
+
+@lru_cache(maxsize=1024)
+def _compile_where(shape: tuple):
+    """
+    Builds the WHERE clause for a filters shape, as computed by
+    SqlBuilder.whereCondition(): one (paramName, logicalOperator,
+    comparisonOperator, size) tuple per condition, where size is the list
+    length for list values, and "null" or "value" otherwise.
+    """
+    parts = ["WHERE"]
+    # next free index per paramAlias, for names repeated across IN clauses
+    aliasCounts = {}
+
+    for name, logicalOperator, comparisonOperator, size in shape:
+        paramName = f'"{name}"'
+        paramAlias = f"param_{name}"
+
+        if isinstance(size, int):
+            if size < 1:
+                # If list is empty, neutral condition (1) to avoid syntax errors
+                parts.append("  1")
+                continue
+
+            # For IN/NOT IN, we expand to multiple params
+            if comparisonOperator != "NOT IN":
+                comparisonOperator = "IN"
+
+            # avoid clashes when same paramAlias appears multiple times
+            next_index = aliasCounts.get(paramAlias, 0)
+            aliasCounts[paramAlias] = next_index + size
+
+            inParamNames = [
+                f"{paramAlias}_{i}" for i in range(next_index, next_index + size)
+            ]
+            # Pad up to the bucket size repeating the last value, which
+            # is harmless for both IN and NOT IN
+            inParamNames += [inParamNames[-1]] * (_in_list_size(size) - size)
+            sqlValue = "(" + ",".join(["%(" + n + ")s" for n in inParamNames])
+            sqlValue += ")"
+        else:
+            # Single value or None
+            sqlValue = "" if size == "null" else f" %({paramAlias})s"
+
+        # Prepend logical operator if needed
+        if logicalOperator is not None:
+            parts.append(logicalOperator)
+
+        parts.append(f"{paramName} {comparisonOperator}{sqlValue}")
+
+    return " ".join(parts)
+
+
+@lru_cache(maxsize=1024)
+def _compile_statement(kind: str, table: str, columns: frozenset, returning):
+    """
+    Builds the INSERT or UPDATE statement for a table and column set, cached
+    across SqlBuilder instances (one per GetDao). Columns are emitted sorted,
+    so every ordering of the same keys gives the same SQL; values are bound
+    by name, so the order does not matter to them.
+    """
+    keys = sorted(columns)
+
+    if kind == "update":
+        pairs = ",".join(['"' + key + '" = %(' + key + ')s' for key in keys])
+        return f'UPDATE "{table}" SET {pairs}'
+
+    columns = ",".join(['"' + key + '"' for key in keys])
+    values = ",".join(["%(" + key + ")s" for key in keys])
+    sql = f'INSERT INTO "{table}" ({columns}) VALUES({values})'
+    if returning is not None:
+        sql = f'{sql} RETURNING "{returning}"'
+    return sql
+
+
 class SqlBuilder:
+    # insert() can append a RETURNING clause for the generated key
+    supportsReturning = True
+
     def __init__(self, table: str):
         self.table = table
         # Firebird uses double quotes for identifiers
         self.basicSelect = f'SELECT * FROM "{table}"'
 
-    def insert(self, data):
+    def insert(self, data, returning=None):
+        """
+        returning: primary key column to hand back through INSERT ... RETURNING.
+        Only applied to single-row (dict) inserts with a single-column key.
+        """
+        if not (isinstance(data, dict) and isinstance(returning, str)):
+            returning = None
+
         if isinstance(data, dict):
             keys = list(data.keys())
         elif isinstance(data, list) and len(data) > 0:
@@ -14,23 +111,13 @@ class SqlBuilder:
         else:
             raise ValueError("Data for insert() must be dict or non-empty list[dict]")
 
-        values = []
-        for key in keys:
-            values.append(f"%({key})s")
-
-        columns = ",".join(f'"{k}"' for k in keys)
-        sql = f'INSERT INTO "{self.table}" ({columns}) VALUES({",".join(values)})'
-        return sql
+        return _compile_statement("insert", self.table, frozenset(keys), returning)
 
     def update(self, data: dict):
         if not isinstance(data, dict) or len(data) == 0:
             raise ValueError("Data for update() must be non-empty dict")
 
-        pairs = []
-        for key in data:
-            pairs.append(f'"{key}" = %({key})s')
-
-        return f'UPDATE "{self.table}" SET {",".join(pairs)}'
+        return _compile_statement("update", self.table, frozenset(data), None)
 
     def delete(self):
         return f'DELETE FROM "{self.table}"'
@@ -39,51 +126,20 @@ class SqlBuilder:
         """
         params: list of dicts in the format produced by GetDao.filters
         (paramName, logicalOperator, comparisonOperator, value)
-        """
-        result = "WHERE"
-        usedParamNames = []
-
-        for condition in params:
-            paramName = f'"{condition["paramName"]}"'
-            paramAlias = f"param_{condition['paramName']}"
-
-            logicalOperator = condition["logicalOperator"]
-            comparisonOperator = condition["comparisonOperator"]
 
-            if isinstance(condition["value"], list):
-                # For IN/NOT IN, we expand to multiple params
-                comparisonOperator = (
-                    "IN" if comparisonOperator != "NOT IN" else comparisonOperator
-                )
-
-                # avoid clashes when same paramAlias appears multiple times
-                next_index = 0
-                while f"{paramAlias}_{next_index}" in usedParamNames:
-                    next_index += 1
-
-                joinedValues = []
-                for i in range(0, len(condition["value"])):
-                    inParamName = f"{paramAlias}_{i + next_index}"
-                    usedParamNames.append(inParamName)
-                    joinedValues.append(f"%({inParamName})s")
-
-                value = f"({','.join(joinedValues)})"
-
-                # If list is empty, neutral condition (1) to avoid syntax errors
-                if len(condition["value"]) < 1:
-                    value = "1"
-                    paramName = ""
-                    paramAlias = ""
-                    logicalOperator = ""
-                    comparisonOperator = ""
-            else:
-                # Single value or None
-                value = f" %({paramAlias})s" if condition["value"] is not None else ""
-
-            # Prepend logical operator if needed
-            if logicalOperator is not None:
-                result = f"{result} {logicalOperator}"
-
-            result = f"{result} {paramName} {comparisonOperator}{value}"
-
-        return result
+        The WHERE clause only depends on the shape of the filters (names,
+        operators, and which values are lists, of what length, or None), so
+        it is built once per shape and reused.
+        """
+        shape = tuple(
+            (
+                condition["paramName"],
+                condition["logicalOperator"],
+                condition["comparisonOperator"],
+                len(condition["value"])
+                if isinstance(condition["value"], list)
+                else "null" if condition["value"] is None else "value",
+            )
+            for condition in params
+        )
+        return _compile_where(shape)